@@ -2,6 +2,7 @@
 import itertools
 import pandas as pd
 
+from fpl_predictor.functions import verbose_print
 from fpl_predictor.squad_builder import SquadBuilder
 from fpl_predictor.squad import PositionFilled, AlreadySelected, MaxedOutTeam
 
@@ -66,8 +67,9 @@ class Optimize(SquadBuilder):
         squad = self.team.sqaud.copy()
         av_budget = self.team.available_budget
         old_score = self.team.total_score
-        for count, row_i in enumerate(team_perms.iterrows()):
-            remove_players = row_i[1].to_dict()
+        columns = list(team_perms.columns)
+        for count, row_i in enumerate(team_perms.itertuples(index=False, name=None)):
+            remove_players = dict(zip(columns, row_i))
             ballers_to_remove = remove_players["ballers"]
             budget = av_budget + remove_players["value_total"]
             better_perms = self.subset_all_perms(remove_players["position"],
@@ -75,25 +77,23 @@ class Optimize(SquadBuilder):
                                                  budget)
             better_perms = better_perms.loc[better_perms["ballers"] != ballers_to_remove]
             if len(better_perms):
-                for row_j in better_perms.iterrows():
+                for ballers_to_add in better_perms["ballers"]:
                     test = self.test_new_team
                     test.team.sqaud = squad.loc[~squad["code"].isin(ballers_to_remove)]
                     try:
-                        p2 = row_j[1].to_dict()
-                        ballers_to_add = p2["ballers"]
                         for b in ballers_to_add:
                             test.add_player(b)
 
                         new_score = test.team.total_score
                         if new_score > old_score:
                             self.team.sqaud = test.team.sqaud
-                            print(f"Increased score by {new_score - old_score:,.3f}")
+                            verbose_print(f"Increased score by {new_score - old_score:,.3f}")
                             return new_score - old_score
                     except (PositionFilled, AlreadySelected, MaxedOutTeam) as e:
                         continue
 
             self._optimisations_tried.append(ballers_to_remove)
-        print("Unable to increase score.")
+        verbose_print("Unable to increase score.")
         return None
 
     def get_current_team_optimisations(self):
@@ -107,8 +107,9 @@ class Optimize(SquadBuilder):
         team_perms.reset_index(drop=True, inplace=True)
         av_budget = self.team.available_budget
 
-        for row_i in team_perms.iterrows():
-            remove_players = row_i[1].to_dict()
+        columns = list(team_perms.columns)
+        for row_i in team_perms.itertuples(index=False, name=None):
+            remove_players = dict(zip(columns, row_i))
             ballers_to_remove = remove_players["ballers"]
             budget = av_budget + remove_players["value_total"]
             better_perms = self.subset_all_perms(remove_players["position"],
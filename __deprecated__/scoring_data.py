@@ -2,7 +2,7 @@
 import numpy as np
 import pandas as pd
 
-from fpl_predictor.functions import year_week_minus_n, next_week
+from fpl_predictor.functions import aggregate, year_week_minus_n, next_week
 
 
 class ScoringData:
@@ -24,10 +24,15 @@ class ScoringData:
         self._player_available_ix = self._index_player_availability
         self.scoring_ix = self.index_players(column=agg_col)
         self.scoring_ix_roi = self.index_players(column=agg_col, roi=True)
+        # Both indices side by side, so `score` aggregates them in one pass:
+        self._scoring_ix_both = pd.concat({"raw_score": self.scoring_ix,
+                                           "roi_score": self.scoring_ix_roi.reindex(columns=self.scoring_ix.columns)},
+                                          axis=1)
         self.positions = self.player_positions
         self.__player_names = dl.player_names
         self.__year_player_team = {k: {k1: dl.team_codes[v1] for k1, v1 in v.items()}
                                    for k, v in dl.year_player_team.items()}
+        self._score_cache = dict()
 
     def index_players(self, column="ict_index", roi=False):
         """Create indexed DataFrame of player values for the given column per gameweek.
@@ -69,17 +74,20 @@ class ScoringData:
                        (df.index.get_level_values("GW") <= week)) |
                       (df.index.get_level_values("year") < year))
                      ]
-        return agg_func(df).sort_values(ascending=False)
+        return aggregate(df, agg_func).sort_values(ascending=False)
 
     def get_player_values(self, year, week):
         """Get all player values in the given year and week."""
-        ix = self._player_value_ix.copy()
+        return self._player_values(year, week).to_dict()
+
+    def _player_values(self, year, week):
+        """Series of all player values in the given year and week, indexed by
+        player code."""
         try:
-            values = ix.loc[(year, week), :]
+            return self._player_value_ix.loc[(year, week), :]
         except KeyError:
             print("No historic values found for week, returning current API `now_cost`.")
-            return self._dl.current_values
-        return values.to_dict()
+            return pd.Series(self._dl.current_values)
 
     def get_players_available(self, year, week):
         """Get all players who were available in the given year and week."""
@@ -132,17 +140,22 @@ class ScoringData:
     def score(self, year, week, n, agg_func=np.mean, cross_seasons=True):
         """Score all players based on the kwargs passed in the initialization of
         this object. The `available` column in the returned DataFrame shows the
-        player availability in the week AFTER the year-week gameweek."""
-        raw_scores = self.aggregate_index(self.scoring_ix, year, week, n,
-                                          agg_func=agg_func, cross_seasons=cross_seasons)
-        df = pd.DataFrame(data=raw_scores, columns=["raw_score"])
-        roi_scores = self.aggregate_index(self.scoring_ix_roi, year, week, n,
-                                          agg_func=agg_func, cross_seasons=cross_seasons)
-        df["roi_score"] = roi_scores
-        df["value"] = df.index.map(self.get_player_values(year, week))
+        player availability in the week AFTER the year-week gameweek. Cached
+        per set of arguments."""
+        key = (year, week, n, agg_func, cross_seasons)
+        if key not in self._score_cache:
+            self._score_cache[key] = self._score(year, week, n, agg_func=agg_func,
+                                                 cross_seasons=cross_seasons)
+        return self._score_cache[key].copy()
+
+    def _score(self, year, week, n, agg_func=np.mean, cross_seasons=True):
+        scores = self.aggregate_index(self._scoring_ix_both, year, week, n,
+                                      agg_func=agg_func, cross_seasons=cross_seasons)
+        df = scores.unstack(0)[["raw_score", "roi_score"]]
+        df = df.sort_values(by="raw_score", ascending=False)
+        df["value"] = self._player_values(year, week).reindex(df.index).to_numpy(np.float64)
         df["position"] = df.index.map(self.positions[year])
-        minutes_percent = self.player_minutes_percent(year, week, n, cross_seasons=cross_seasons)
-        df["minutes_percent"] = df.index.map(minutes_percent)
+        df["minutes_percent"] = self.player_minutes_percent(year, week, n, cross_seasons=cross_seasons)
         next_y, next_w = next_week(year, week)
         df["available"] = df.index.map(self.get_players_available(next_y, next_w))
         df["available"] = df["available"].fillna(False)
@@ -3,9 +3,11 @@ from numbers import Number
 import numpy as np
 import pandas as pd
 
-from fpl_predictor.functions import previous_week
+from fpl_predictor.functions import previous_week, top_player, verbose_print
 from fpl_predictor.squad import Squad
 
+POSITIONS = ["GK", "DEF", "MID", "FWD"]
+
 
 class TeamBuilder:
     def __init__(self, scoring_data, year, week, n=10, min_minute_percent=0.5,
@@ -47,6 +49,27 @@ class TeamBuilder:
         self.scores = self._scoring_data.score(self.scoring_year, self.scoring_week, self.n,
                                                agg_func=self.agg_func, cross_seasons=self.cross_seasons)
 
+        # Player data as numpy arrays, for selecting players in `build_team`:
+        self._codes = self.scores.index.to_numpy()
+        self._raw = self.scores["raw_score"].to_numpy(np.float64)
+        self._roi = self.scores["roi_score"].to_numpy(np.float64)
+        self._value = self.scores["value"].to_numpy(np.float64)
+        # Positions and teams as small integer codes (-1 where missing):
+        self._position = pd.Categorical(self.scores["position"], categories=POSITIONS).codes
+        teams = pd.Categorical(self.scores["team"])
+        self._teams = teams.codes.astype(np.int16)
+        self._team_names = teams.categories
+        self._available = self.scores["available"].to_numpy(bool)
+        self._code_to_row = {code: i for i, code in enumerate(self._codes)}
+
+        # Player indices in `select_player` order for each selection metric:
+        self._order = {"raw_score": np.lexsort((-self._roi, self._value, -self._raw)),
+                       "roi_score": np.lexsort((-self._raw, self._value, -self._roi))}
+        # Each order's negated (so ascending) scores, to find a `min_score` or
+        # `min_roi` cutoff with `searchsorted`:
+        self._neg_sorted = {"raw_score": -self._raw[self._order["raw_score"]],
+                            "roi_score": -self._roi[self._order["roi_score"]]}
+
         # Attributes for tracking team selections:
         self.team = Squad()
 
@@ -54,49 +77,73 @@ class TeamBuilder:
         self.__first_team = pd.DataFrame()
 
     def player_pool(self, position=None, drop_unavailable=True, min_score=None,
-                    min_roi=None, max_price=None):
+                    min_roi=None, max_price=None, order_by="raw_score"):
         """Pool of players to select from that meet criteria. Excludes players
-        already selected at the `team.team` attribute.
+        already selected at the `team.team` attribute. The pool is returned in
+        `select_player` order for the `order_by` metric (either `raw_score` or
+        `roi_score`).
         """
-        df = self.scores.copy()
+        rows = self._pool_rows(position=position, drop_unavailable=drop_unavailable,
+                               min_score=min_score, min_roi=min_roi, max_price=max_price,
+                               order_by=order_by)
+        return self.scores.iloc[rows]
+
+    def _pool_rows(self, position=None, drop_unavailable=True, min_score=None,
+                   min_roi=None, max_price=None, order_by="raw_score"):
+        """Row positions in `scores` of the `player_pool` players, in the same
+        order. Lets callers read the score arrays without slicing `scores`."""
+        if order_by not in self._order:
+            raise ValueError(f"Invalid `order_by` arg: {order_by}")
+        # Candidate rows in the precomputed order, so the pool is never sorted.
+        # The order is by descending `order_by` score, so a minimum on that
+        # score is just a prefix of it:
+        rows = self._order[order_by]
+        if order_by == "raw_score" and isinstance(min_score, Number):
+            rows = rows[:np.searchsorted(self._neg_sorted[order_by], -min_score)]
+            min_score = None
+        elif order_by == "roi_score" and isinstance(min_roi, Number):
+            rows = rows[:np.searchsorted(self._neg_sorted[order_by], -min_roi)]
+            min_roi = None
+
+        # Build one mask over the candidates' scores arrays:
         if drop_unavailable:
-            df = df.loc[df["available"]]
+            mask = self._available[rows]
+        else:
+            mask = np.ones(len(rows), dtype=bool)
         if position:
             if isinstance(position, str):
                 position = [position]
-            assert all([p in ["GK", "DEF", "MID", "FWD"] for p in position])
-            df = df.loc[df["position"].isin(position)]
+            assert all([p in POSITIONS for p in position])
+            mask &= np.isin(self._position[rows], [POSITIONS.index(p) for p in position])
         if isinstance(min_score, Number):
-            df = df.loc[df["raw_score"] > min_score]
+            mask &= self._raw[rows] > min_score
         if isinstance(min_roi, Number):
-            df = df.loc[df["roi_score"] > min_roi]
+            mask &= self._roi[rows] > min_roi
         if isinstance(max_price, Number):
-            df = df.loc[df["value"] <= max_price]
-        df = df.loc[~df.index.isin(self.team.selected_list)]
-        if len(self.team.maxed_out_teams):
-            df = df.loc[~df["team"].isin(self.team.maxed_out_teams)]
-        return df
+            mask &= self._value[rows] <= max_price
+        mask &= ~np.isin(self._codes[rows], self.team.selected_codes)
+        maxed_out_teams = self.team.maxed_out_teams
+        if len(maxed_out_teams):
+            maxed_out_codes = self._team_names.get_indexer(list(maxed_out_teams))
+            mask &= ~np.isin(self._teams[rows], maxed_out_codes[maxed_out_codes >= 0])
+        return rows[mask]
 
     @staticmethod
     def select_player(pool, select_by="raw_score"):
         """Pick the top player from a player pool based on either `raw_score` or
-        `roi_score`. In the event of ties the cheapest player is selected first;
-        if that also ties selection is based on the other metric."""
+        `roi_score`, breaking ties as in `top_player`."""
         if select_by == "raw_score":
-            sort_by = ["raw_score", "value", "roi_score"]
+            other = "roi_score"
         elif select_by == "roi_score":
-            sort_by = ["roi_score", "value", "raw_score"]
+            other = "raw_score"
         else:
             raise ValueError(f"Invalid `select_by` arg: {select_by}")
-        pool.sort_values(by=sort_by, ascending=[False, True, False], inplace=True)
-        code = list(pool.index)[0]
-        player = pool.loc[code].to_dict()
-        player["code"] = code
-        return player
+        return top_player(pool, select_by, other)
 
     def build_team(self, n_by_raw_score=None):
         """Build a team, first by selecting based purely on raw score regardless
-        of price, then by selecting on roi.
+        of price, then by selecting on roi. If the squad can't be filled, the
+        number selected by raw score is reduced by 1 until it can.
 
         Args:
             n_by_raw_score (int): number of players to select by raw score.
@@ -105,30 +152,26 @@ class TeamBuilder:
             n_by_raw_score = self.n_by_raw_score
         assert n_by_raw_score <= 15, "Maximum number of players is 15"
         self.team.remove_all_players()
-        for p in range(n_by_raw_score):
-            pool = self.player_pool(position=self.team.need_positions,
-                                    drop_unavailable=True, min_score=None, min_roi=None,
-                                    max_price=self.team.available_budget)
-            if not len(pool):
-                self.build_team(n_by_raw_score - 1)
-                return
-            player = self.select_player(pool, select_by="raw_score")
-            self.team.add_player(**player)
 
-        for p in range(15 - len(self.team.selected)):
-            pool = self.player_pool(position=self.team.need_positions,
-                                    drop_unavailable=True, min_score=None, min_roi=None,
-                                    max_price=self.team.available_budget)
-            if not len(pool):
-                self.build_team(n_by_raw_score - 1)
-                return
-            player = self.select_player(pool, select_by="roi_score")
+        limits = np.array([self.team.limits[p] for p in POSITIONS])
+        for n_by_raw_score in range(n_by_raw_score, -1, -1):
+            picks = _pick_kernel(self._order["raw_score"], self._order["roi_score"],
+                                 self._position, self._teams, self._value, self._available,
+                                 n_by_raw_score=n_by_raw_score, budget=self.team.cap, limits=limits)
+            if len(picks) == limits.sum():
+                break
+        else:
+            raise ValueError("Unable to fill squad from the available players.")
+
+        for i in picks:
+            player = self.scores.iloc[i].to_dict()
+            player["code"] = self._codes[i]
             self.team.add_player(**player)
 
-        print(f"Build team with {n_by_raw_score} players by raw score, {15 - n_by_raw_score} by roi, "
-              f"using {self.n} games data. "
-              f"Total score = {self.team.total_score}. "
-              f"Remaining budget = {self.team.available_budget}")
+        verbose_print(f"Build team with {n_by_raw_score} players by raw score, {15 - n_by_raw_score} by roi, "
+                      f"using {self.n} games data. "
+                      f"Total score = {self.team.total_score}. "
+                      f"Remaining budget = {self.team.available_budget}")
         self.pick_first_team(sort_by=self.pick_team_by)
 
     @staticmethod
@@ -145,37 +188,30 @@ class TeamBuilder:
         """Pick the highest scoring 11 players from the team squad, sorted by
         the columns given in the `by` argument."""
         sort_by = self._sort_cols(sort_by)
-        df = self.team.selected.copy()
-        df.sort_values(by=sort_by, ascending=False, inplace=True)
+        df = self.team.selected.sort_values(by=sort_by, ascending=False)
+        squad = df.to_dict("records")
         max_pos_picks = {"GK": 1, "DEF": 5, "MID": 5, "FWD": 5}
         pos_filled = {k: 0 for k in max_pos_picks}
-        first_team = pd.DataFrame(columns=df.columns)
-        for row in df.iterrows():
-            player = row[1].to_dict()
+        first_team = list()
+        for player in squad:
             position = player["position"]
-            position_count = len(first_team.loc[first_team["position"] == position])
-            if position_count < max_pos_picks[position]:
-                first_team = first_team.append(player, ignore_index=True)
+            if pos_filled[position] < max_pos_picks[position]:
+                first_team.append(player)
                 pos_filled[position] += 1
             if len(first_team) == 11:
                 break
 
-        # If a position has no players, drop the lowest player from the other positions:
+        # If a position has no players, drop the lowest player from the other positions
+        # (players are already in `sort_by` order):
         missing = [k for k, v in pos_filled.items() if v == 0]
         if len(missing):
             missing_position = missing[0]
-            to_remove = first_team.loc[first_team["position"] != "GK"].copy()
-            to_remove.sort_values(by=sort_by, ascending=False, inplace=True)
-            to_remove = list(to_remove["uuid"])[-1]
-            first_team = first_team.loc[first_team["uuid"] != to_remove]
-            to_add = df.loc[df["position"] == missing_position].copy()
-            to_add.sort_values(by=sort_by, ascending=False, inplace=True)
-            for row in to_add.iterrows():
-                player = row[1].to_dict()
-                first_team = first_team.append(player, ignore_index=True)
-                break
+            to_remove = [p for p in first_team if p["position"] != "GK"][-1]
+            first_team.remove(to_remove)
+            to_add = [p for p in squad if p["position"] == missing_position]
+            first_team.extend(to_add[:1])
 
-        self.__first_team = first_team
+        self.__first_team = pd.DataFrame(first_team, columns=df.columns)
 
     @property
     def first_team(self):
@@ -186,21 +222,23 @@ class TeamBuilder:
         improve the overall team score."""
         transfers = pd.DataFrame(columns=["old", "new", "score_differential",
                                           "roi_differential", "value_differential"])
-        df = self.team.selected.copy()
-        for row in df.iterrows():
-            player = row[1].to_dict()
-            pool = self.player_pool(position=player["position"],
-                                    drop_unavailable=True,
-                                    min_score=player["raw_score"],
-                                    min_roi=["roi_score"],
-                                    max_price=player["value"] + self.team.available_budget)
-            if len(pool):
-                new_player = pool.loc[list(pool.index)[0]].to_dict()
-                new_player["uuid"] = list(pool.index)[0]
-                transfer = {"old": player["uuid"], "new": new_player["uuid"],
-                            "score_differential": new_player["total_points (raw)"] - player["raw_score"],
-                            "roi_differential": new_player["total_points (roi)"] - player["roi_score"],
-                            "value_differential": new_player["value"] - player["value"],
+        df = self.team.selected
+        columns = list(df.columns)
+        for row in df.itertuples(index=False, name=None):
+            player = dict(zip(columns, row))
+            rows = self._pool_rows(position=player["position"],
+                                   drop_unavailable=True,
+                                   min_score=player["raw_score"],
+                                   min_roi=["roi_score"],
+                                   max_price=player["value"] + self.team.available_budget,
+                                   order_by="raw_score")
+            if len(rows):
+                # Read the top player straight from the score arrays:
+                i = rows[0]
+                transfer = {"old": player["uuid"], "new": self._codes[i],
+                            "score_differential": self._raw[i] - player["raw_score"],
+                            "roi_differential": self._roi[i] - player["roi_score"],
+                            "value_differential": self._value[i] - player["value"],
                             }
                 transfers = transfers.append(transfer, ignore_index=True)
 
@@ -219,8 +257,8 @@ class TeamBuilder:
 
     def add_player(self, code: int):
         """Shortcut to add a player to the team."""
-        player = self.scores.loc[code].to_dict()
-        player = {k: v for k, v in player.items() if k in self.team.selected.columns}
+        player = self.scores.iloc[self._code_to_row[code]].to_dict()
+        player = {k: v for k, v in player.items() if k in self.team.columns}
         player["code"] = code
         self.team.add_player(**player)
 
@@ -230,7 +268,7 @@ class TeamBuilder:
             return dict()
         else:
             df = self.first_team.sort_values(by="raw_score")
-            captain = df.loc[list(df.index)[-1]]
+            captain = df.iloc[-1]
         return {captain["uuid"]: captain["name"]}
 
     @property
@@ -239,5 +277,52 @@ class TeamBuilder:
             return dict()
         else:
             df = self.first_team.sort_values(by="raw_score")
-            captain = df.loc[list(df.index)[-2]]
+            captain = df.iloc[-2]
         return {captain["uuid"]: captain["name"]}
+
+
+def _pick_kernel(order_raw, order_roi, position, team, value, available,
+                 n_by_raw_score, budget, limits, max_per_team=3):
+    """Greedily pick the squad's player indices, the first `n_by_raw_score` in
+    `order_raw` order and the rest in `order_roi` order, keeping to the
+    position `limits`, `budget` and `max_per_team`. Stops early if the pool
+    runs out, so fewer than `limits.sum()` indices may be returned.
+
+    Args:
+        order_raw (np.ndarray): player indices in raw score selection order.
+        order_roi (np.ndarray): player indices in roi selection order.
+        position (np.ndarray): position code per player (-1 if missing).
+        team (np.ndarray): team code per player (-1 if missing).
+        value (np.ndarray): value per player.
+        available (np.ndarray): boolean availability per player.
+        n_by_raw_score (int): number of players to pick in `order_raw` order.
+        budget (float): total budget for the squad.
+        limits (np.ndarray): number of players needed per position code.
+        max_per_team (int): maximum number of players from one team.
+    """
+    mask = available & (position >= 0)
+    need = limits.copy()
+    # Sized so players with a missing team (-1) count in a spare last slot:
+    team_count = np.zeros(team.max() + 2, dtype=np.int32)
+    picks = list()
+    for order, n_picks in [(order_raw, n_by_raw_score), (order_roi, limits.sum() - n_by_raw_score)]:
+        # Positions needed, budget and team limits only ever tighten, so a
+        # player passed over stays ineligible; resume after the last pick:
+        start = 0
+        for _ in range(n_picks):
+            ranked = order[start:]
+            candidates = mask[ranked] & (need[position[ranked]] > 0) & (value[ranked] <= budget)
+            # The pool has run out, so return the short list of picks:
+            if start >= len(order) or not candidates.any():
+                return np.array(picks, dtype=np.int64)
+            j = candidates.argmax()
+            i = ranked[j]
+            start += j + 1
+            picks.append(i)
+            mask[i] = False
+            need[position[i]] -= 1
+            budget -= value[i]
+            team_count[team[i]] += 1
+            if team_count[team[i]] == max_per_team:
+                mask &= team != team[i]
+    return np.array(picks, dtype=np.int64)
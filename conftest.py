@@ -0,0 +1,2 @@
+# Lets pytest import the `fpl_predictor` and `__deprecated__` packages from the
+# repository root, however the tests are run.
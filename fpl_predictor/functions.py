@@ -121,4 +121,43 @@ def aggregate_index(index, year: int, week: int, n: int,
                    (df.index.get_level_values("GW") <= week)) |
                   (df.index.get_level_values("year") < year))
                  ]
-    return agg_func(df).sort_values(ascending=False)
+    return aggregate(df, agg_func).sort_values(ascending=False)
+
+
+def aggregate(df, agg_func=np.mean):
+    """Aggregate each column of `df` with `agg_func`. The common numpy
+    reductions are called directly as the equivalent DataFrame method rather
+    than going through numpy's dispatch to pandas.
+
+    Args:
+        df (pd.DataFrame): data to aggregate.
+        agg_func (function): function to use to aggregate data.
+    """
+    if agg_func is np.mean:
+        return df.mean()
+    if agg_func is np.sum:
+        return df.sum()
+    return agg_func(df)
+
+
+def top_player(pool, score_col: str, other_col: str):
+    """Get the top player in `pool` on `score_col` as a dict including their
+    `code` (the pool's index). In the event of ties the cheapest player is
+    selected first; if that also ties selection is based on `other_col`. The
+    pool is neither sorted nor modified.
+
+    Args:
+        pool (pd.DataFrame): players indexed by code, with a `value` column.
+        score_col (str): column to select the top player on.
+        other_col (str): column to break ties on after `value`.
+    """
+    scores = pool[score_col].to_numpy(np.float64)
+    top = np.flatnonzero(scores == np.nanmax(scores))
+    if len(top) > 1:
+        values = pool["value"].to_numpy(np.float64)[top]
+        top = top[values == values.min()]
+    if len(top) > 1:
+        top = top[[pool[other_col].to_numpy(np.float64)[top].argmax()]]
+    player = pool.iloc[top[0]].to_dict()
+    player["code"] = pool.index[top[0]]
+    return player
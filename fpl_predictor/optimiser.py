@@ -16,7 +16,8 @@ def get_perms(raw, r=2):
         raw["score_per_value"] = raw["score"] / raw["value"]
     codes = list(raw["code"])
     perms = list(itertools.combinations(codes, r=r))
-    df = pd.DataFrame(data=perms, columns=[f"p{i}" for i in range(r)])
+    player_cols = [f"p{i}" for i in range(r)]
+    df = pd.DataFrame(data=perms, columns=player_cols)
     scores = dict(zip(raw["code"], raw["score"]))
     score_per_vals = dict(zip(raw["code"], raw["score_per_value"]))
     positions = dict(zip(raw["code"], raw["position"]))
@@ -35,7 +36,6 @@ def get_perms(raw, r=2):
     position_cols = [f"p{i}_position" for i in range(r)]
     df["positions"] = tuple(zip(*[df[c] for c in position_cols]))
     df["positions"] = [tuple(sorted(p)) for p in df["positions"]]
-    player_cols = [c for c in df.columns if "p" in c and len(c) == 2]
     df["players"] = tuple(zip(*[df[c] for c in player_cols]))
     df["players"] = [tuple(sorted(p)) for p in df["players"]]
     return df
@@ -57,10 +57,11 @@ def squad_optimisations(self, year, week, live=False, r=2,
     may be met by already selected players."""
     df = pd.DataFrame()
     score_col = "score_per_value" if score_per_value else "score"
+    total_col = f"{score_col}_total"
 
     # Get all r-length permutations of the current squad:
     squad_perms = get_perms(self.Squad.selected, r=r)
-    squad_perms.sort_values(by=[f"{score_col}_total", "value_total"], ascending=[True, False], inplace=True)
+    squad_perms.sort_values(by=[total_col, "value_total"], ascending=[True, False], inplace=True)
     squad_perms.reset_index(drop=True, inplace=True)
 
     # Get all possible r-length permutations of players not in the squad:
@@ -70,24 +71,24 @@ def squad_optimisations(self, year, week, live=False, r=2,
     # Amount of spare budget to add to total available to spend:
     spare_budget = self.Squad.available_budget
 
-    for row_i in squad_perms.iterrows():
-        remove = row_i[1].to_dict()
-        players_to_remove = remove["players"]
-        budget = spare_budget + remove["value_total"]
-        better_perms = subset_perms(df=pool_perms, positions=remove["positions"],
-                                    min_score=remove[f"{score_col}_total"],
+    remove_cols = ["players", "positions", "value_total", "score_total", "score_per_value_total"]
+    for players_to_remove, positions, value_total, score_total, score_per_value_total in \
+            zip(*[squad_perms[c].to_numpy() for c in remove_cols]):
+        budget = spare_budget + value_total
+        better_perms = subset_perms(df=pool_perms, positions=positions,
+                                    min_score=score_per_value_total if score_per_value else score_total,
                                     max_val=budget, score_per_value=score_per_value)
         better_perms = better_perms.loc[better_perms["players"] != players_to_remove]
         if len(better_perms):
             s = better_perms.iloc[0].to_dict()
             s["players_to_remove"] = players_to_remove
-            s["to_remove_value_total"] = remove["value_total"]
-            s[f"to_remove_score_total"] = remove["score_total"]
-            s[f"to_remove_score_per_value_total"] = remove["score_per_value_total"]
+            s["to_remove_value_total"] = value_total
+            s["to_remove_score_total"] = score_total
+            s["to_remove_score_per_value_total"] = score_per_value_total
             df = df.append(s, ignore_index=True)
     if len(df):
         df["value_diff"] = df["value_total"] - df["to_remove_value_total"]
-        df["score_diff"] = df["score_total"] - df[f"to_remove_score_total"]
+        df["score_diff"] = df["score_total"] - df["to_remove_score_total"]
         df["score_per_value_diff"] = df["score_per_value_total"] - df["to_remove_score_per_value_total"]
         df.sort_values(by=[f"{score_col}_diff", "value_diff"], ascending=[False, True], inplace=True)
     return df.reset_index(drop=True)
@@ -104,6 +105,14 @@ def optimiser(self, year: int, week: int, iterations: int = 100,
     increase = 0
     original_score = self.Squad.total_score_per_val if score_per_value else self.Squad.total_score
 
+    # Player names and teams don't change while optimising, so load them once:
+    names = self.PlayerInformation.player_names(live=live)
+    teams = self.PlayerInformation.player_teams(year, live=live)
+
+    # Column names of each new player's attributes in the optimisations:
+    new_player_cols = [(f"p{p}", f"p{p}_position", f"p{p}_val", f"p{p}_score", f"p{p}_score_per_val")
+                       for p in range(r)]
+
     for i in range(iterations):
         optimisations = squad_optimisations(self, year, week, live=live, r=r, score_per_value=score_per_value)
         if not len(optimisations):
@@ -113,25 +122,26 @@ def optimiser(self, year: int, week: int, iterations: int = 100,
                           f"\n> Raised {score_col} by total: {increase:,.3f}"
                           f"\n> New total {score_col}: {new_score:,.3f}")
             return
-        for row in optimisations.iterrows():
-            opt = row[1].to_dict()
+        columns = list(optimisations.columns)
+        for row in optimisations.itertuples(index=False, name=None):
+            opt = dict(zip(columns, row))
             to_remove = opt["players_to_remove"]
 
             # Create a copy of the current team to try replacements:
-            test = self._test_new_squad
-            current_squad = self.Squad.selected.copy()
-            test.selected = current_squad.loc[~current_squad["code"].isin(to_remove)]
+            test = self.Squad.copy()
+            for code in to_remove:
+                test.remove_player(code, verbose=False)
 
             # Try to add each new player:
             try:
-                for p in range(r):
-                    add_player = dict(code=int(opt[f"p{p}"]))
-                    add_player["name"] = self.PlayerInformation.player_names(live=live)[add_player["code"]]
-                    add_player["position"] = opt[f"p{p}_position"]
-                    add_player["value"] = opt[f"p{p}_val"]
-                    add_player["score"] = opt[f"p{p}_score"]
-                    add_player["score_per_value"] = opt[f"p{p}_score_per_val"]
-                    add_player["team"] = self.PlayerInformation.player_teams(year, live=live)[add_player["code"]]
+                for code_col, position_col, val_col, player_score_col, score_per_val_col in new_player_cols:
+                    add_player = dict(code=int(opt[code_col]))
+                    add_player["name"] = names[add_player["code"]]
+                    add_player["position"] = opt[position_col]
+                    add_player["value"] = opt[val_col]
+                    add_player["score"] = opt[player_score_col]
+                    add_player["score_per_value"] = opt[score_per_val_col]
+                    add_player["team"] = teams[add_player["code"]]
                     test.add_player(**add_player)
                 if score_per_value:
                     added = (test.total_score_per_val - self.Squad.total_score_per_val)
@@ -139,7 +149,7 @@ def optimiser(self, year: int, week: int, iterations: int = 100,
                     added = (test.total_score - self.Squad.total_score)
                 verbose_print(f"Increased {score_col} by: {added}")
                 increase += added
-                self.Squad.selected = test.selected
+                self.Squad.copy_from(test)
                 break
             except (AlreadySelected, MaxedOutTeam):
                 continue
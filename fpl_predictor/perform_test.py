@@ -72,7 +72,7 @@ def perform_test(metrics: list, ns: list, year: int, weeks: list,
     for combo in combinations:
         af, cs, pc, mmp = combo[0], combo[1], combo[2], combo[3]
         metric, n, week = combo[4], combo[5], combo[6]
-        if not all([sqb.agg_func == af,
+        if not all([sqb.agg_func_name == af,
                     sqb.cross_seasons == cs,
                     sqb.percent_chance == pc,
                     sqb.min_minute_percent == mmp]):
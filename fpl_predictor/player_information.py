@@ -18,13 +18,14 @@ class PlayerInformation:
         fp = os.path.join(DIR_STRUCTURED_DATA, "master.csv")
         df = pd.read_csv(fp, encoding="utf-8", dtype=csvtypes)
         self._master = df
+        # Row positions of each year-week, so subsets don't scan the master DF:
+        self._year_week_rows = df.groupby(["year", "GW"]).indices
 
     def _master_year_week(self, year, week):
         """Get a subset of the master DF for the given year-week."""
         assert 0 < week < 39, f"Week must be int from 1 to 38"
-        df = self._master.copy()
-        df = df.loc[(df["year"] == year) & (df["GW"] == week)]
-        return df.reset_index(drop=True)
+        rows = self._year_week_rows.get((year, week), [])
+        return self._master.iloc[rows].reset_index(drop=True)
 
     @property
     def _team_codes(self):
@@ -43,8 +44,9 @@ class PlayerInformation:
             fp = os.path.join(DIR_STRUCTURED_DATA, "year_player_team.json")
             with open(fp, "r") as f:
                 d = json.load(f)[str(year)]
-            d = {int(k): self._team_codes[int(v)] for k, v in d.items()}
-            return d
+            # `_team_codes` reads its JSON file, so only load it once:
+            team_codes = self._team_codes
+            return {int(k): team_codes[int(v)] for k, v in d.items()}
 
     def player_names(self, live=False):
         """Dictionary of player codes to player names."""
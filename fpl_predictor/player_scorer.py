@@ -4,6 +4,7 @@ from numbers import Number
 import numpy as np
 import pandas as pd
 
+from fpl_predictor.functions import aggregate
 from nav import DIR_STRUCTURED_DATA
 
 
@@ -28,6 +29,10 @@ class PlayerScorer:
         # Index players by how many minutes they played:
         self.minutes = self.index_master(column="minutes")
 
+        # Indexed columns to reuse when aggregating, and cached `get_all_scores`:
+        self._indexed = {metric: self.scores, "minutes": self.minutes}
+        self._all_scores_cache = dict()
+
     def index_master(self, column: str = "ict_index"):
         """Create an indexed DataFrame of player values for the given column of data
          in master. The returned DataFrame has player codes as columns, and
@@ -54,7 +59,10 @@ class PlayerScorer:
             cross_seasons (bool): if not True, only gameweeks in the same year
                 as `year` are returned (so `n` may be reduced).
         """
-        df = self.index_master(column=column)
+        if column in self._indexed:
+            df = self._indexed[column]
+        else:
+            df = self.index_master(column=column)
         ix_list = df.index.to_list()
         max_ix = ix_list.index((year, week)) + 1
         min_ix = max_ix - n
@@ -62,7 +70,7 @@ class PlayerScorer:
         if not cross_seasons:
             indices = [t for t in indices if t[0] == year]
         df = df.loc[indices]
-        return agg_func(df).sort_values(ascending=False)
+        return aggregate(df, agg_func).sort_values(ascending=False)
 
     def get_player_minutes_percent(self, year: int, week: int, n: int,
                                    cross_seasons: bool = False):
@@ -85,14 +93,21 @@ class PlayerScorer:
     def get_all_scores(self, year: int, week: int, n: int, agg_func=np.mean,
                        cross_seasons: bool = True):
         """Score all players based on the `metric` passed in the initialization
-        of this class instance."""
+        of this class instance. Memoised on the arguments."""
+        key = (year, week, n, agg_func, cross_seasons)
+        if key not in self._all_scores_cache:
+            self._all_scores_cache[key] = self._get_all_scores(year, week, n, agg_func=agg_func,
+                                                               cross_seasons=cross_seasons)
+        return self._all_scores_cache[key].copy()
+
+    def _get_all_scores(self, year: int, week: int, n: int, agg_func=np.mean,
+                        cross_seasons: bool = True):
         df = self.aggregate_master(year, week, n, column=self.metric,
                                    agg_func=agg_func, cross_seasons=cross_seasons)
-        df = pd.DataFrame(data=df, columns=[self.metric])
-        df.reset_index(inplace=True)
-        mins = self.get_player_minutes_percent(year, week, n, cross_seasons=cross_seasons)
-        df["minutes_percent"] = df["code"].map(mins)
-        return df.set_index("code")
+        df = df.to_frame(self.metric)
+        # Aligned on the player code index:
+        df["minutes_percent"] = self.get_player_minutes_percent(year, week, n, cross_seasons=cross_seasons)
+        return df
 
     def get_player_gw_score(self, code: int, year: int, week: int):
         """Get an individual player's score for a given year-week."""
@@ -1,4 +1,6 @@
 
+from collections import Counter
+import numpy as np
 import os
 import pandas as pd
 
@@ -40,73 +42,141 @@ class MaxedOutTeam(Exception):
 class Squad:
     limits = {"FWD": 3, "MID": 5, "DEF": 5, "GK": 2}
     cap = 1000
+    size = 15
     columns = ["code", "name", "position", "value", "score", "score_per_value", "team"]
+    dtype = np.dtype([("code", "i8"), ("name", "O"), ("position", "U3"), ("value", "f8"),
+                      ("score", "f8"), ("score_per_value", "f8"), ("team", "O")])
 
     def __init__(self):
-        """Class for tracking a fantasy squad."""
-        self.selected = pd.DataFrame(columns=self.columns)
+        """Class for tracking a fantasy squad. Players are stored in a fixed
+        size numpy structured array; the `selected` DataFrame is only built
+        when requested."""
+        self.remove_all_players()
+
+    def __len__(self):
+        """Number of players currently selected."""
+        return self._n
+
+    @property
+    def selected(self):
+        """DataFrame of the selected players, sorted by score descending."""
+        arr = self._arr[:self._n]
+        order = np.lexsort((arr["value"], -arr["score_per_value"], -arr["score"]))
+        return pd.DataFrame(arr[order], columns=self.columns)
+
+    @selected.setter
+    def selected(self, df):
+        """Replace the squad with the players in the DataFrame `df` (e.g. when
+        assigned by the optimiser or `load_squad`)."""
+        assert len(df) <= self.size, f"Squad can't have more than {self.size} players"
+        self.remove_all_players()
+        self._n = len(df)
+        for c in self.columns:
+            self._arr[c][:self._n] = df[c].to_numpy()
+        self._code_set = set(self._arr["code"][:self._n].tolist())
+        self._team_count = Counter(self._arr["team"][:self._n].tolist())
+        self._pos_count = Counter(self._arr["position"][:self._n].tolist())
+        self._total_value = self._arr["value"][:self._n].sum()
 
     def remove_all_players(self):
-        self.selected = pd.DataFrame(columns=self.columns)
+        self._arr = np.empty(self.size, dtype=self.dtype)
+        self._n = 0
+        self._code_set = set()
+        self._team_count = Counter()
+        self._pos_count = Counter()
+        self._total_value = 0
+
+    def copy(self):
+        """Copy of the squad which can be changed without affecting this one."""
+        squad = Squad()
+        squad.copy_from(self)
+        return squad
+
+    def copy_from(self, squad):
+        """Replace this squad's players with a copy of those in `squad`, in
+        place, so existing references to this squad see the change."""
+        self._arr, self._n = squad._arr.copy(), squad._n
+        self._code_set = set(squad._code_set)
+        self._team_count = Counter(squad._team_count)
+        self._pos_count = Counter(squad._pos_count)
+        self._total_value = squad._total_value
 
     @property
     def total_score(self):
-        return self.selected["score"].sum()
+        return self._arr["score"][:self._n].sum()
 
     @property
     def total_score_per_val(self):
-        return self.selected["score_per_value"].sum()
+        return self._arr["score_per_value"][:self._n].sum()
 
     @property
     def total_value(self):
-        return self.selected["value"].sum()
+        """Running total kept up to date by `add_player`/`remove_player`, as
+        the budget is checked for every player added."""
+        return self._total_value
 
     @property
     def available_budget(self):
-        return 1000 - self.total_value
+        return self.cap - self._total_value
 
     @property
     def selected_list(self):
-        return sorted(self.selected["code"])
+        return sorted(self._code_set)
+
+    @property
+    def selected_codes(self):
+        """Array of the selected players' codes, in no particular order."""
+        return self._arr["code"][:self._n].copy()
 
     @property
     def substitutes(self):
-        df = self.selected.loc[~self.selected["code"].isin(list(self.first_team["code"]))]
+        df = self.selected
+        df = df.loc[~df["code"].isin(self.first_team["code"].to_numpy())]
         return df.reset_index(drop=True)
 
     def add_player(self, code: str, name: str, position: str, value: float,
                    score: float, score_per_value: float, team: str, **kwargs):
         new_player = {"code": int(code), "name": name, "position": position, "team": team,
                       "value": value, "score": score, "score_per_value": score_per_value}
-        if len(self.selected.loc[self.selected["position"] == position]) == self.limits[position]:
+        if self._pos_count[position] >= self.limits[position]:
             raise PositionFilled(new_player)
-        if self.total_value + value > self.cap:
+        if self._total_value + value > self.cap:
             raise NotEnoughMoney(new_player)
-        if code in self.selected_list:
+        if int(code) in self._code_set:
             raise AlreadySelected(new_player)
         if team in self.maxed_out_teams:
             raise MaxedOutTeam(new_player)
-        self.selected = self.selected.append(new_player, ignore_index=True)
-        self.selected.sort_values(by=["score", "score_per_value", "value"],
-                                  ascending=[False, False, True], inplace=True)
-        self.selected.reset_index(drop=True, inplace=True)
-
-    def remove_player(self, code):
-        if code not in list(self.selected["code"]):
+        self._arr[self._n] = tuple(new_player[c] for c in self.columns)
+        self._n += 1
+        self._code_set.add(int(code))
+        self._team_count[team] += 1
+        self._pos_count[position] += 1
+        self._total_value += value
+
+    def remove_player(self, code, verbose: bool = True):
+        if code not in self._code_set:
             raise ValueError(f"code not in team: {code}")
-        name = self.selected.loc[self.selected["code"] == code, "name"].values[0]
-        self.selected = self.selected.loc[self.selected["code"] != code].reset_index(drop=True)
-        verbose_print(f"Removed player from squad ({len(self.selected)} remain): {name}")
+        i = np.flatnonzero(self._arr["code"][:self._n] == code)[0]
+        name, team, position = self._arr["name"][i], self._arr["team"][i], self._arr["position"][i]
+        value = self._arr["value"][i]
+        # Swap the last player into the removed slot:
+        self._n -= 1
+        self._arr[i] = self._arr[self._n]
+        self._code_set.discard(code)
+        self._team_count[team] -= 1
+        self._pos_count[position] -= 1
+        self._total_value -= value
+        if verbose:
+            verbose_print(f"Removed player from squad ({self._n} remain): {name}")
 
     @property
     def squad_full(self):
-        return True if len(self.selected) == 15 else False
+        return True if self._n == self.size else False
 
     @property
     def full_by_position(self):
-        full = dict(self.selected["position"].value_counts())
         template = {"FWD": 0, "MID": 0, "DEF": 0, "GK": 0}
-        return {**template, **full}
+        return {**template, **self._pos_count}
 
     @property
     def empty_by_position(self):
@@ -119,12 +189,8 @@ class Squad:
 
     @property
     def maxed_out_teams(self):
-        """List of teams from which 3 players have already been selected."""
-        df = self.selected.copy()
-        if len(df) < 3:
-            return list()
-        team_count = df["team"].value_counts().to_dict()
-        return [k for k, v in team_count.items() if v >= 3]
+        """Set of teams from which 3 players have already been selected."""
+        return frozenset(k for k, v in self._team_count.items() if v >= 3)
 
     def save_squad(self, filename):
         fp = os.path.join(DIR_SQUADS, f"{filename}.csv")
@@ -143,25 +209,22 @@ class Squad:
         if not self.squad_full:
             verbose_print("Squad not full, can't pick first team.")
             return
-        df = self.selected
-        df.sort_values(by=["score", "score_per_value", "value"], ascending=[False, False, True], inplace=True)
-
-        first_team = pd.DataFrame()
+        # Players are already sorted by score, score_per_value, value:
+        squad = self.selected.to_dict("records")
 
         # First pick a keeper:
-        keeper = df.loc[df["position"] == "GK", :].iloc[0].to_dict()
-        first_team = first_team.append(keeper, ignore_index=True)
-        df = df.loc[df["position"] != "GK"]
+        first_team = [next(p for p in squad if p["position"] == "GK")]
 
         # Then pick the rest of the team:
         max_picks = {"DEF": 5, "MID": 5, "FWD": 3}
         picked = {"DEF": 0, "MID": 0, "FWD": 0}
-        for row in df.iterrows():
+        for player in squad:
             if len(first_team) == 11:
                 break
-            player = row[1].to_dict()
+            if player["position"] == "GK":
+                continue
             if picked[player["position"]] < max_picks[player["position"]]:
-                first_team = first_team.append(player, ignore_index=True)
+                first_team.append(player)
                 picked[player["position"]] += 1
             # Can't have 5 midfielders AND 5 defenders:
             if picked["DEF"] == 5:
@@ -169,6 +232,7 @@ class Squad:
             if picked["MID"] == 5:
                 max_picks["DEF"] = 4
 
+        first_team = pd.DataFrame(first_team, columns=self.columns)
         first_team["code"] = first_team["code"].astype(int)
         return first_team
 
@@ -199,9 +263,8 @@ class Squad:
             verbose_print("Squad not full, can't pick captain.")
             return
         else:
-            df = self.selected
-            df.sort_values(by=["score", "score_per_value", "value"], ascending=[False, False, True], inplace=True)
-            captain = df.iloc[0]
+            # `selected` is already sorted by score:
+            captain = self.selected.iloc[0]
         return {captain["code"]: captain["name"]}
 
     @property
@@ -210,7 +273,5 @@ class Squad:
             verbose_print("Squad not full, can't pick vice-captain.")
             return
         else:
-            df = self.selected
-            df.sort_values(by=["score", "score_per_value", "value"], ascending=[False, False, True], inplace=True)
-            vc = df.iloc[1]
+            vc = self.selected.iloc[1]
         return {vc["code"]: vc["name"]}
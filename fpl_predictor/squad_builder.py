@@ -2,7 +2,7 @@ from numbers import Number
 import numpy as np
 import pandas as pd
 
-from fpl_predictor.functions import previous_week, verbose_print
+from fpl_predictor.functions import previous_week, top_player, verbose_print
 from fpl_predictor.optimiser import optimiser
 from fpl_predictor.squad import Squad
 from fpl_predictor.player_scorer import PlayerScorer
@@ -26,14 +26,15 @@ class SquadBuilder:
         `scoring_metric`. The team is picked FOR the year-week, using data up to
         and including the PREVIOUS year-week. If `live` then current data from
         the live API is used for availability, price etc."""
+        self._player_scorers = dict()
         self.set_scoring_metric(scoring_metric)
         self.set_n(n)
         self.cross_seasons = cross_seasons
         functions = dict(mean=np.mean, sum=np.sum)
+        self.agg_func_name = agg_func
         self.agg_func = functions[agg_func]
         self.percent_chance = percent_chance
         self.min_minute_percent = min_minute_percent
-        self.PlayerScorer = PlayerScorer(metric=self.scoring_metric)
         self.ApiData = ApiData()
         self.PlayerInformation = PlayerInformation()
 
@@ -51,6 +52,7 @@ class SquadBuilder:
             except KeyError:
                 pass
         self._ix_player_available = df.fillna(True)
+        self._available_cache = dict()
 
         # Attributes for tracking team selections:
         self.Squad = Squad()
@@ -61,7 +63,10 @@ class SquadBuilder:
         return sorted(self.PlayerScorer.master.columns)
 
     def set_scoring_metric(self, metric):
-        self.PlayerScorer = PlayerScorer(metric=metric)
+        # Each PlayerScorer loads and indexes the master data, so keep one per metric:
+        if metric not in self._player_scorers:
+            self._player_scorers[metric] = PlayerScorer(metric=metric)
+        self.PlayerScorer = self._player_scorers[metric]
         self.__scoring_metric = metric
         self.__val_metric = f"{metric}_per_value"
 
@@ -87,8 +92,17 @@ class SquadBuilder:
         if live:
             return self.ApiData.players_available(percent_chance=percent_chance)
         else:
-            s = self._ix_player_available.loc[(year, week), :].fillna(False)
-            return s.to_dict()
+            return self._availability(year, week).to_dict()
+
+    def _availability(self, year, week, live=False, percent_chance=100):
+        """Boolean Series of player availability indexed by player code. The
+        historic availability is fixed, so it's cached per year-week."""
+        if live:
+            return pd.Series(self.ApiData.players_available(percent_chance=percent_chance)).astype(bool)
+        if (year, week) not in self._available_cache:
+            s = self._ix_player_available.loc[(year, week), :].fillna(False).astype(bool)
+            self._available_cache[(year, week)] = s
+        return self._available_cache[(year, week)]
 
     def players(self, year: int, week: int, live=False):
         """Get a DataFrame of all players, sorted by total score on the
@@ -99,6 +113,9 @@ class SquadBuilder:
         df = self.PlayerScorer.get_all_scores(year=prev_y, week=prev_w, n=self.n, agg_func=self.agg_func,
                                               cross_seasons=self.cross_seasons)
         df = self.PlayerInformation.add_player_info_to_df(df, year=year, week=week, live=live)
+        # Few unique values, so categoricals make the repeated `isin` filters cheap:
+        df["position"] = df["position"].astype("category")
+        df["team"] = df["team"].astype("category")
         # Add in the points-per-value metric:
         df[self.val_metric] = df[self.scoring_metric] / df["value"]
         return df
@@ -109,75 +126,70 @@ class SquadBuilder:
                         drop_maxed_out=True):
         """Get a pool of players to select from which meet the criteria."""
         df = self.players(year, week, live)
+
+        # Build one mask over the players and only slice the DataFrame once:
+        mask = np.ones(len(df), dtype=bool)
         n = len(df)
 
         if position:
             position = [position] if isinstance(position, str) else position
             assert all([p in ["GK", "DEF", "MID", "FWD"] for p in position]), \
                 f"invalid position(s): {', '.join(position)}"
-            df = df.loc[df["position"].isin(position)]
-            verbose_print(f"Dropped {n - len(df):,} rows for `position`")
-            n = len(df)
+            mask &= df["position"].isin(position).to_numpy()
+            verbose_print(f"Dropped {n - mask.sum():,} rows for `position`")
+            n = mask.sum()
         if isinstance(min_score, Number):
-            df = df.loc[df[self.scoring_metric] > min_score]
-            verbose_print(f"Dropped {n - len(df):,} rows for `min_score`")
-            n = len(df)
+            mask &= df[self.scoring_metric].to_numpy() > min_score
+            verbose_print(f"Dropped {n - mask.sum():,} rows for `min_score`")
+            n = mask.sum()
         if isinstance(min_score_per_value, Number):
-            df = df.loc[df[self.val_metric] > min_score_per_value]
-            verbose_print(f"Dropped {n - len(df):,} rows for `min_score_per_value`")
-            n = len(df)
+            mask &= df[self.val_metric].to_numpy() > min_score_per_value
+            verbose_print(f"Dropped {n - mask.sum():,} rows for `min_score_per_value`")
+            n = mask.sum()
         if isinstance(max_val, Number):
-            df = df.loc[df["value"] <= max_val]
-            verbose_print(f"Dropped {n - len(df):,} rows for `max_val`")
-            n = len(df)
+            mask &= df["value"].to_numpy() <= max_val
+            verbose_print(f"Dropped {n - mask.sum():,} rows for `max_val`")
+            n = mask.sum()
         if isinstance(self.min_minute_percent, Number):
-            df = df.loc[df["minutes_percent"] >= self.min_minute_percent]
-            verbose_print(f"Dropped {n - len(df):,} rows for `self.min_minute_percent`")
-            n = len(df)
+            mask &= df["minutes_percent"].to_numpy() >= self.min_minute_percent
+            verbose_print(f"Dropped {n - mask.sum():,} rows for `self.min_minute_percent`")
+            n = mask.sum()
         if drop_unavailable:
-            available = self.player_availability(year, week, live, self.percent_chance)
-            df["available"] = df.index.map(available)
-            # Drop False available (or NaN - assumed to have left league):
-            df["available"].fillna(False, inplace=True)
-            df = df.loc[df["available"]]
-            verbose_print(f"Dropped {n - len(df):,} rows for `drop_unavailable`")
-            n = len(df)
+            available = self._availability(year, week, live, self.percent_chance)
+            # Drop False available (or missing - assumed to have left league):
+            df["available"] = available.reindex(df.index, fill_value=False).to_numpy(bool)
+            mask &= df["available"].to_numpy()
+            verbose_print(f"Dropped {n - mask.sum():,} rows for `drop_unavailable`")
+            n = mask.sum()
 
         # Remove already selected players:
         if drop_selected:
-            df = df.loc[~df.index.isin(self.Squad.selected_list)]
-            verbose_print(f"Dropped {n - len(df):,} rows for `drop_selected`")
-            n = len(df)
+            mask &= ~df.index.isin(self.Squad.selected_codes)
+            verbose_print(f"Dropped {n - mask.sum():,} rows for `drop_selected`")
+            n = mask.sum()
 
         # Remove players from teams already maxed out:
         if drop_maxed_out:
             if len(self.Squad.maxed_out_teams):
-                df = df.loc[~df["team"].isin(self.Squad.maxed_out_teams)]
-                verbose_print(f"Dropped {n - len(df):,} rows for `drop_maxed_out`")
-                n = len(df)
-
-        # Rename scoring columns to generic names:
-        df.rename(columns={self.scoring_metric: "score", self.val_metric: "score_per_value"}, inplace=True)
+                mask &= ~df["team"].isin(self.Squad.maxed_out_teams).to_numpy()
+                verbose_print(f"Dropped {n - mask.sum():,} rows for `drop_maxed_out`")
+                n = mask.sum()
 
         # Drop players with NaNs in these columns - they have left the league:
-        df.dropna(subset=["position", "value", "team", "score_per_value"], inplace=True)
+        mask &= df[["position", "value", "team", self.val_metric]].notna().all(axis=1).to_numpy()
 
-        return df
+        # Rename scoring columns to generic names:
+        return df.loc[mask].rename(columns={self.scoring_metric: "score", self.val_metric: "score_per_value"})
 
     @staticmethod
     def _select_player(pool, score_per_value=False):
         """Pick the top player from a player pool based on either `score` or
-        `score_per_value`. In the event of ties the cheapest player is selected
-        first; if that also ties selection is based on the other metric."""
+        `score_per_value`, breaking ties as in `top_player`."""
         if not score_per_value:
-            sort_by = ["score", "value", "score_per_value"]
+            score_col, other_col = "score", "score_per_value"
         else:
-            sort_by = ["score_per_value", "value", "score"]
-        pool.sort_values(by=sort_by, ascending=[False, True, False], inplace=True)
-        code = list(pool.index)[0]
-        player = pool.loc[code].to_dict()
-        player["code"] = code
-        return player
+            score_col, other_col = "score_per_value", "score"
+        return top_player(pool, score_col, other_col)
 
     def squad_unavailable(self, year, week, live=False, percent_chance=100):
         """Identify members of the currently selected squad who are unavailable
@@ -249,7 +261,8 @@ class SquadBuilder:
                 else:
                     to_score = revert
 
-        return {k: v for k, v in points.items() if k in list(to_score["code"])}
+        to_score = set(to_score["code"])
+        return {k: v for k, v in points.items() if k in to_score}
 
     def add_player(self, code: int, year: int, week: int, live=False):
         """Add a player to the current squad."""
@@ -273,19 +286,25 @@ class SquadBuilder:
         score_col = "score_per_value" if score_per_value else "score"
         df.sort_values(by=[score_col, "value"], ascending=[False, True], inplace=True)
 
-        while len(self.Squad.selected) < n_top:
-            df = df.loc[(df["position"].isin(self.Squad.need_positions)) &
-                        (~df["team"].isin(self.Squad.maxed_out_teams))]
-            row = df.reset_index().iloc[0].to_dict()
+        # Only re-filter the pool when needed positions or maxed out teams change:
+        need, maxed = None, None
+        while len(self.Squad) < n_top:
+            if (need, maxed) != (self.Squad.need_positions, self.Squad.maxed_out_teams):
+                need, maxed = self.Squad.need_positions, self.Squad.maxed_out_teams
+                df = df.loc[(df["position"].isin(need)) & (~df["team"].isin(maxed))]
+            row = df.iloc[0].to_dict()
+            row["code"] = df.index[0]
             self.Squad.add_player(**row)
             df = df.iloc[1:]
 
         # Now just keep adding cheap players:
         df.sort_values(by=["value", "score"], ascending=[True, False], inplace=True)
         while not self.Squad.squad_full:
-            df = df.loc[(df["position"].isin(self.Squad.need_positions)) &
-                        (~df["team"].isin(self.Squad.maxed_out_teams))]
-            row = df.reset_index().iloc[0].to_dict()
+            if (need, maxed) != (self.Squad.need_positions, self.Squad.maxed_out_teams):
+                need, maxed = self.Squad.need_positions, self.Squad.maxed_out_teams
+                df = df.loc[(df["position"].isin(need)) & (~df["team"].isin(maxed))]
+            row = df.iloc[0].to_dict()
+            row["code"] = df.index[0]
             self.Squad.add_player(**row)
             df = df.iloc[1:]
 
@@ -1,5 +1,5 @@
 
-import numpy as np
+from collections import Counter
 import pandas as pd
 
 from fpl_predictor.squad_builder import SquadBuilder
@@ -16,46 +16,77 @@ def build(self: SquadBuilder, year: int, week: int, live=False, **kwargs):
 
     # Sort by value ascending, score descending:
     df.sort_values(by=["value", "score"], ascending=[True, False], inplace=True)
+    df.reset_index(inplace=True)
 
     # Just keep adding players!
-    while not self.squad.squad_full:
-        df = df.loc[(df["position"].isin(self.squad.need_positions)) &
-                    (~df["team"].isin(self.squad.maxed_out_teams))]
-        row = df.reset_index().iloc[0].to_dict()
+    picks = _greedy_pick(df["position"].tolist(), df["team"].tolist(),
+                         need=self.squad.limits, size=self.squad.size)
+    for row in df.iloc[picks].to_dict("records"):
         self.squad.add_player(**row)
-        df = df.iloc[1:]
 
     return self.squad.selected
 
 
+def _greedy_pick(positions: list, teams: list, need: dict, size: int,
+                 max_per_team: int = 3):
+    """Single pass over players (in order of preference) returning the indices
+    of the first `size` players that fit the positions still `need`ed without
+    picking more than `max_per_team` players from one team."""
+    need = dict(need)
+    team_count = Counter()
+    picks = list()
+    for i, (position, team) in enumerate(zip(positions, teams)):
+        if need.get(position, 0) > 0 and team_count[team] < max_per_team:
+            picks.append(i)
+            need[position] -= 1
+            team_count[team] += 1
+            if len(picks) == size:
+                break
+    return picks
+
+
 def evaluate_transfers(self, year, week, live=False, percent_chance=100,
                        unavailable_first=True):
     """Evaluate transfers on the current team for the given year-week."""
     df = pd.DataFrame()
     spare_budget = self.squad.available_budget
-    for row in self.squad.selected.iterrows():
-        player = row[1].to_dict()
-        pool = self._player_pool(year, week, live=live, position=player["position"],
-                                 min_score=player["score"], max_val=spare_budget + player["value"])
-        if len(pool):
+    selected = self.squad.selected
+
+    # Build each position's pool once, in `_select_player` order, then filter
+    # per player with a mask instead of rebuilding the pool for every row:
+    pools = dict()
+    for position in set(selected["position"]):
+        pool = self._player_pool(year, week, live=live, position=position)
+        pool = pool.sort_values(by=["score", "value", "score_per_value"], ascending=[False, True, False])
+        pools[position] = (pool, pool["score"].to_numpy(), pool["value"].to_numpy())
+
+    columns = list(selected.columns)
+    for row in selected.itertuples(index=False, name=None):
+        player = dict(zip(columns, row))
+        pool, scores, values = pools[player["position"]]
+        mask = (scores > player["score"]) & (values <= spare_budget + player["value"])
+        if mask.any():
+            i = int(mask.argmax())
             old_player = {f"out_{k}": v for k, v in player.items()}
-            transfer = self._select_player(pool)
+            transfer = pool.iloc[i].to_dict()
+            transfer["code"] = pool.index[i]
             transfer = {**old_player, **transfer}
             df = df.append(transfer, ignore_index=True)
     if not len(df):
         return "No transfers found."
-    df["score_gain"] = df["score"] - df["out_score"]
-    df["score_per_val_gain"] = df["score_per_value"] - df["out_score_per_value"]
-    df["val_gain"] = df["out_value"] - df["value"]
-    df.sort_values(by=["score_gain", "score_per_val_gain"], ascending=False, inplace=True)
+    # Evaluated together (with numexpr if it's installed):
+    df.eval("score_gain = score - out_score\n"
+            "score_per_val_gain = score_per_value - out_score_per_value\n"
+            "val_gain = out_value - value", inplace=True)
 
     # Prioritize current first_team/squad who are unavailable.
     squad_unavailable = self.squad_unavailable(year, week, live=live, percent_chance=percent_chance)
     first_team_unavailable = self.first_team_unavailable(year, week, live=live, percent_chance=percent_chance)
-    df["squad_unavailable"] = np.where(df["out_code"].isin(squad_unavailable), True, False)
-    df["first_team_unavailable"] = np.where(df["out_code"].isin(first_team_unavailable), True, False)
-    if unavailable_first:
-        df.sort_values(by=["first_team_unavailable", "squad_unavailable"], ascending=False, inplace=True)
+    df["squad_unavailable"] = df["out_code"].isin(squad_unavailable)
+    df["first_team_unavailable"] = df["out_code"].isin(first_team_unavailable)
+    sort_by = ["first_team_unavailable", "squad_unavailable"] if unavailable_first else []
+    sort_by += ["score_gain", "score_per_val_gain"]
+    df.sort_values(by=sort_by, ascending=False, kind="mergesort", inplace=True)
 
     return df.reset_index(drop=True).drop(columns=["out_position"])
 
@@ -76,19 +107,20 @@ def make_tranfers(self: SquadBuilder, n_transfers: int,
     for t in range(n_transfers):
         if not len(transfer_list):
             break
-        for row in transfer_list.iterrows():
+        columns = list(transfer_list.columns)
+        for row in transfer_list.itertuples(index=False, name=None):
             try:
-                p = row[1]
-                test_squad = self._test_new_squad
-                test_squad.selected = self.squad.selected
+                p = dict(zip(columns, row))
+                # Try the transfer on a copy of the squad's arrays, only kept if it works:
+                test_squad = self.squad.copy()
                 remove_code = p["out_code"]
                 add_code = p["code"]
-                test_squad.remove_player(remove_code)
+                test_squad.remove_player(remove_code, verbose=False)
                 test_squad.add_player(code=p["code"], name=p["name"], position=p["position"],  value=p["value"],
                                       score=p["score"], score_per_value=p["score_per_value"], team=p["team"])
                 transfer_list = transfer_list.loc[transfer_list["code"] != add_code]
                 transfer_list = transfer_list.loc[transfer_list["out_code"] != remove_code]
-                self.squad.selected = test_squad.selected
+                self.squad.copy_from(test_squad)
                 n_made += 1
                 break
             except MaxedOutTeam:
@@ -0,0 +1,36 @@
+import numpy as np
+
+from __deprecated__.teambuilder import _pick_kernel
+
+
+def _pick(n_players, n_by_raw_score, limits=(2, 5, 5, 3), budget=1000.0):
+    """Run `_pick_kernel` on a pool of `n_players` available players, all
+    midfielders from different teams, ranked in index order."""
+    order = np.arange(n_players)
+    position = np.full(n_players, 2, dtype=np.int8)
+    team = np.arange(n_players, dtype=np.int16)
+    value = np.full(n_players, 50.0)
+    available = np.ones(n_players, dtype=bool)
+    return _pick_kernel(order, order, position, team, value, available,
+                        n_by_raw_score=n_by_raw_score, budget=budget,
+                        limits=np.array(limits))
+
+
+def test_pick_kernel_pool_smaller_than_picks():
+    picks = _pick(2, n_by_raw_score=3)
+    assert picks.tolist() == [0, 1]
+
+
+def test_pick_kernel_pool_runs_out_in_roi_phase():
+    picks = _pick(3, n_by_raw_score=1)
+    assert picks.tolist() == [0, 1, 2]
+
+
+def test_pick_kernel_stops_at_position_limit():
+    picks = _pick(10, n_by_raw_score=2)
+    assert picks.tolist() == [0, 1, 2, 3, 4]
+
+
+def test_pick_kernel_keeps_to_budget():
+    picks = _pick(10, n_by_raw_score=0, budget=120.0)
+    assert picks.tolist() == [0, 1]